@@ -15,9 +15,12 @@ import httpx
 
 SERVER = "http://localhost:80"
 
+# Shared client so repeated requests (e.g. `all`) reuse one keep-alive connection
+CLIENT = httpx.Client(base_url=SERVER, timeout=30)
+
 
 def list_scenarios():
-    resp = httpx.get(f"{SERVER}/scenarios", timeout=10)
+    resp = CLIENT.get("/scenarios", timeout=10)
     scenarios = resp.json()
     print("\nAvailable scenarios:")
     for s in scenarios:
@@ -27,7 +30,7 @@ def list_scenarios():
 
 def make_call(index: int):
     print(f"\n Triggering scenario {index}...")
-    resp = httpx.post(f"{SERVER}/calls/{index}", timeout=30)
+    resp = CLIENT.post(f"/calls/{index}")
     if resp.status_code == 200:
         data = resp.json()
         print(f"   Call placed — {data['scenario']}")
@@ -37,7 +40,7 @@ def make_call(index: int):
 
 
 def run_all(delay: int = 30):
-    resp = httpx.get(f"{SERVER}/scenarios", timeout=10)
+    resp = CLIENT.get("/scenarios", timeout=10)
     scenarios = resp.json()
 
     for i, s in enumerate(scenarios):
@@ -71,10 +74,10 @@ if __name__ == "__main__":
 
     # Check server is running
     try:
-        httpx.get(f"{SERVER}/scenarios", timeout=5)
+        CLIENT.get("/scenarios", timeout=5)
     except httpx.ConnectError:
         print(" Server not running. Start it first:")
-        print("   uvicorn server:app --host 0.0.0.0 --port 8000")
+        print("   uvicorn server:app --host 0.0.0.0 --port 8000 --loop uvloop --ws-per-message-deflate false")
         sys.exit(1)
 
     if args.scenario == "all":
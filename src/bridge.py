@@ -11,43 +11,198 @@ restructure session.update to use the nested audio config format.
 """
 
 import asyncio
-import json
-from datetime import datetime
-
+import atexit
+import base64
+import binascii
+import collections
+import logging
+import logging.handlers
+import os
+import queue
+import ssl
+import sys
+import time
+from datetime import datetime, timezone
+
+import orjson
 import websockets
-from config import OPENAI_API_KEY, REALTIME_MODEL
+from config import LOG_LEVEL, OPENAI_API_KEY, REALTIME_MODEL, TRANSCRIPTS_DIR, USE_BINARY_AUDIO
+from scenarios import PATIENT_INSTRUCTIONS, SCENARIOS
 
 REALTIME_URL = f"wss://api.openai.com/v1/realtime?model={REALTIME_MODEL}"
 
-PATIENT_WRAPPER = (
-    "You are role-playing as a patient calling an orthopedic clinic (Pivot Point "
-    "Orthopedics) on the phone. You are speaking with the clinic's AI receptionist.\n\n"
-    "RULES:\n"
-    "- Stay in character at all times as the patient described below\n"
-    "- Respond naturally and conversationally, like a real phone call\n"
-    "- Keep responses to 1-3 sentences — don't monologue\n"
-    "- Do not narrate actions or use stage directions\n"
-    "- If the receptionist asks for info your character has, provide it naturally\n"
-    "- When the conversation reaches a natural end, say goodbye politely\n\n"
-    "PATIENT PERSONA:\n{scenario_prompt}\n\n"
-    "Start the conversation with something like: \"{opening_line}\""
-)
+# One TLS context for every bridge, so the CA store is loaded once per
+# process instead of on each connect
+_SSL_CONTEXT = ssl.create_default_context()
+
+# Bridge logs are only enqueued on the event loop; a QueueListener thread
+# does the actual stdout writes so a slow terminal can't stall audio.
+log = logging.getLogger(__name__)
+_log_level = logging.getLevelName(LOG_LEVEL)
+log.setLevel(_log_level if isinstance(_log_level, int) else logging.INFO)
+log.propagate = False
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+log.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler(sys.stdout))
+_log_listener.start()
+atexit.register(_log_listener.stop)
+if not isinstance(_log_level, int):
+    log.warning("  Unknown LOG_LEVEL %r, using INFO", LOG_LEVEL)
+
+
+def _captures_agent(scenario: dict) -> bool:
+    """Whether to Whisper-transcribe the agent's side of the call."""
+    return scenario.get("capture_agent_transcripts", True)
+
+
+def _session_update(scenario: dict) -> str:
+    """Serialize the session.update that configures one patient persona."""
+    session = {
+        "modalities": ["text", "audio"],
+        "instructions": PATIENT_INSTRUCTIONS[scenario["id"]],
+        "voice": "alloy",
+        "input_audio_format": "g711_ulaw",
+        "output_audio_format": "g711_ulaw",
+        "turn_detection": {
+            "type": "server_vad",
+            "threshold": 0.5,
+            "prefix_padding_ms": 300,
+            "silence_duration_ms": 700,
+        },
+        "temperature": 0.8,
+    }
+    if _captures_agent(scenario):
+        session["input_audio_transcription"] = {"model": "whisper-1"}
+    return orjson.dumps({"type": "session.update", "session": session}).decode()
+
+
+# Scenario id → pre-serialized session.update, sent verbatim on connect
+SESSION_UPDATES = {s["id"]: _session_update(s) for s in SCENARIOS}
+
+
+# Known Realtime events we can safely ignore in logs
+_IGNORED_EVENTS = frozenset({
+    "response.done",
+    "response.output_item.added",
+    "response.content_part.added",
+    "response.audio.done",
+    "response.content_part.done",
+    "response.output_item.done",
+    "input_audio_buffer.speech_started",
+    "input_audio_buffer.committed",
+})
+
+_TYPE_PREFIX = '{"type":"'
+_DELTA_KEY = '"delta":"'
+
+
+def _peek_type(raw) -> str | None:
+    """Read the event type from the head of a raw Realtime frame.
+
+    Relies on OpenAI serializing "type" as the first key; returns None when
+    it doesn't, and the caller falls back to a full JSON parse.
+    """
+    if not isinstance(raw, str) or not raw.startswith(_TYPE_PREFIX):
+        return None
+    end = raw.find('"', len(_TYPE_PREFIX))
+    if end < 0:
+        return None
+    return raw[len(_TYPE_PREFIX):end]
+
+
+def _audio_delta_payload(raw: str) -> str | None:
+    """Slice the base64 audio out of a raw response.audio.delta event.
+
+    Returns None for anything unusual (e.g. escaped characters), in which
+    case the caller falls back to a full JSON parse.
+    """
+    start = raw.find(_DELTA_KEY)
+    if start < 0:
+        return None
+    start += len(_DELTA_KEY)
+    end = raw.find('"', start)
+    if end < 0:
+        return None
+    delta = raw[start:end]
+    if "\\" in delta:
+        return None
+    return delta
 
 
 class RealtimeBridge:
     """Manages one OpenAI Realtime session bridged to a Telnyx media stream."""
 
+    # Telnyx media frame around a base64 payload. Base64 is ASCII with no
+    # characters JSON needs to escape, so the frame can be spliced directly.
+    # Kept as str: Telnyx media streams are JSON text frames, so this must
+    # go out via send_text even though the payload is pure ASCII.
+    _MEDIA_PREFIX = '{"event":"media","media":{"payload":"'
+    _MEDIA_SUFFIX = '"}}'
+
+    # Most audio deltas coalesced into one outbound Telnyx frame, and the
+    # base64 size at which a batch is flushed early to keep frames small
+    _TX_BATCH_MAX_FRAMES = 16
+    _TX_BATCH_MAX_CHARS = 8 * 1024
+    _TX_QUEUE_SIZE = 256
+
+    # Turns kept in memory; the full transcript is in the .jsonl log
+    _TRANSCRIPT_MAX_TURNS = 2000
+
+    # Seconds between audio progress lines (DEBUG level only)
+    _AUDIO_LOG_INTERVAL = 5.0
+
+    # Backpressure on the Telnyx side: once this much audio is waiting to be
+    # sent, drop new deltas until the backlog drains below the low mark.
+    # Losing a few 20ms frames beats the socket buffer growing until the
+    # connection dies.
+    _TX_HIGH_WATER = 512 * 1024
+    _TX_LOW_WATER = 1024
+
     def __init__(self, scenario: dict, telnyx_ws, call_control_id: str):
         self.scenario = scenario
         self.telnyx_ws = telnyx_ws  # FastAPI WebSocket
         self.call_control_id = call_control_id
         self.openai_ws = None
-        self.transcript: list[dict] = []
-        self.started_at = datetime.utcnow().isoformat()
-        self._listener_task = None
+        # Recent turns for the saved .txt; every turn is also appended to a
+        # .jsonl log on disk so long calls don't grow memory without bound
+        self.transcript: collections.deque[dict] = collections.deque(maxlen=self._TRANSCRIPT_MAX_TURNS)
+        self._transcript_file = None
+        self.started_at_ns = time.time_ns()
+        # File stem shared by this call's .txt and .jsonl transcripts: scenario,
+        # start time, and the call ID so concurrent calls never collide
+        timestamp = time.strftime("%Y%m%d_%H%M%S", time.gmtime(self.started_at_ns / 1e9))
+        safe_id = "".join(c for c in call_control_id if c.isalnum() or c in "-_")
+        self.transcript_stem = f"{scenario['id']}_{timestamp}_{safe_id}"
+        self._tasks: set[asyncio.Task] = set()  # background tasks owned by this bridge
+        self._tx_queue: asyncio.Queue[str] = asyncio.Queue(self._TX_QUEUE_SIZE)
+        self._tx_pending = 0  # base64 bytes queued or in flight to Telnyx
+        self._tx_dropping = False
         self._connected = False
         self._audio_chunks_received = 0  # from Telnyx (agent audio)
         self._audio_chunks_sent = 0      # to Telnyx (bot audio)
+        self._rx_logged_at = 0.0
+        self._tx_logged_at = 0.0
+
+        # Realtime event type → handler. Audio deltas dominate the stream,
+        # so dispatch is a single dict lookup rather than an if/elif chain.
+        self._handlers = {
+            "response.audio.delta": self._on_audio_delta,
+            "response.audio_transcript.done": self._on_patient_transcript,
+            "session.updated": self._on_session_updated,
+            "error": self._on_error,
+            "response.created": self._on_response_created,
+            "input_audio_buffer.speech_stopped": self._on_speech_stopped,
+        }
+        if _captures_agent(scenario):
+            self._handlers["conversation.item.input_audio_transcription.completed"] = (
+                self._on_agent_transcript
+            )
+
+    @property
+    def started_at(self) -> str:
+        """Call start as a naive UTC ISO timestamp, rendered on demand."""
+        started = datetime.fromtimestamp(self.started_at_ns / 1e9, timezone.utc)
+        return started.replace(tzinfo=None).isoformat()
 
     async def connect(self):
         """Open WebSocket to OpenAI Realtime API and configure the session."""
@@ -57,52 +212,48 @@ class RealtimeBridge:
         }
 
         try:
+            # g711_ulaw is already compressed, so permessage-deflate would
+            # only burn CPU on every audio frame. max_queue absorbs a few
+            # seconds of bursty deltas before reads push back on OpenAI.
+            # (TCP_NODELAY needs no setup: asyncio and uvloop enable it on
+            # every TCP transport.)
             self.openai_ws = await websockets.connect(
                 REALTIME_URL,
                 additional_headers=headers,
                 max_size=None,
+                max_queue=128,
+                compression=None,
+                write_limit=2**20,
+                ping_interval=20,
+                ssl=_SSL_CONTEXT,
+                open_timeout=5,
+                close_timeout=1,
             )
         except Exception as e:
-            print(f"  Failed to connect to OpenAI Realtime: {e}")
+            log.info("  Failed to connect to OpenAI Realtime: %s", e)
             return
 
         self._connected = True
 
+        # Open the turn log before the call starts talking, off the event loop
+        self._transcript_file = await asyncio.to_thread(
+            open, os.path.join(TRANSCRIPTS_DIR, f"{self.transcript_stem}.jsonl"), "ab"
+        )
+
         # Wait for session.created before sending session.update
         raw = await self.openai_ws.recv()
-        created = json.loads(raw)
+        created = orjson.loads(raw)
         if created.get("type") == "session.created":
-            print(f"  Realtime session created: {created['session'].get('id', 'n/a')}")
+            log.info("  Realtime session created: %s", created["session"].get("id", "n/a"))
         else:
-            print(f"  Unexpected first event: {created.get('type')}")
+            log.info("  Unexpected first event: %s", created.get("type"))
 
         # Configure session for telephony audio (g711_ulaw)
-        await self._send({
-            "type": "session.update",
-            "session": {
-                "modalities": ["text", "audio"],
-                "instructions": PATIENT_WRAPPER.format(
-                    scenario_prompt=self.scenario["system_prompt"],
-                    opening_line=self.scenario["opening_line"],
-                ),
-                "voice": "alloy",
-                "input_audio_format": "g711_ulaw",
-                "output_audio_format": "g711_ulaw",
-                "input_audio_transcription": {
-                    "model": "whisper-1",
-                },
-                "turn_detection": {
-                    "type": "server_vad",
-                    "threshold": 0.5,
-                    "prefix_padding_ms": 300,
-                    "silence_duration_ms": 700,
-                },
-                "temperature": 0.8,
-            },
-        })
+        await self.openai_ws.send(SESSION_UPDATES[self.scenario["id"]])
 
-        # Start background listener for OpenAI → Telnyx direction
-        self._listener_task = asyncio.create_task(self._listen_openai())
+        # Start background listener + writer for OpenAI → Telnyx direction
+        self._spawn(self._listen_openai())
+        self._spawn(self._telnyx_writer())
 
         # Kick off the conversation, inject the opening line so the bot speaks first.
         # We add it as a user message (pretending the agent greeted us) and then
@@ -125,15 +276,20 @@ class RealtimeBridge:
         })
         await self._send({"type": "response.create"})
 
-        print(f"  Realtime bridge ready — Scenario: {self.scenario['name']}")
+        log.info("  Realtime bridge ready — Scenario: %s", self.scenario["name"])
 
     # Telnyx → OpenAI (inbound agent audio)
     async def forward_audio_to_openai(self, audio_base64: str):
         """Send a chunk of inbound audio (agent's voice) to OpenAI."""
         if self._connected and self.openai_ws:
             self._audio_chunks_received += 1
-            if self._audio_chunks_received in (1, 10, 50, 100, 500):
-                print(f"  Audio chunks received from Telnyx: {self._audio_chunks_received}")
+            if self._audio_chunks_received == 1:
+                log.info("  Audio flowing from Telnyx")
+            elif log.isEnabledFor(logging.DEBUG):
+                now = time.monotonic()
+                if now - self._rx_logged_at >= self._AUDIO_LOG_INTERVAL:
+                    self._rx_logged_at = now
+                    log.debug("  Audio chunks received from Telnyx: %d", self._audio_chunks_received)
             await self._send({
                 "type": "input_audio_buffer.append",
                 "audio": audio_base64,
@@ -142,103 +298,203 @@ class RealtimeBridge:
     # OpenAI → Telnyx (patient audio + transcript capture)
     async def _listen_openai(self):
         """Background task: read events from OpenAI and forward audio to Telnyx."""
+        recv = self.openai_ws.recv
+        send_audio = self._send_telnyx_audio
         try:
-            async for raw in self.openai_ws:
-                event = json.loads(raw)
-                etype = event.get("type", "")
-
-                # Audio output: patient voice → play on the call
-                if etype == "response.audio.delta":
-                    audio = event.get("delta", "")
+            while True:
+                raw = await recv()
+                # Hot loop: while the patient is speaking, frames are audio
+                # deltas back to back. Forward them without parsing or any
+                # control-event dispatch until something else arrives.
+                while True:
+                    if USE_BINARY_AUDIO and isinstance(raw, bytes):
+                        # Raw g711_ulaw frame: one base64 encode for Telnyx
+                        audio = base64.b64encode(raw).decode("ascii")
+                    elif (
+                        _peek_type(raw) != "response.audio.delta"
+                        or (audio := _audio_delta_payload(raw)) is None
+                    ):
+                        break
                     if audio:
-                        await self._send_telnyx_audio(audio)
-
-                # Transcript: patient (bot) finished a response
-                elif etype == "response.audio_transcript.done":
-                    text = event.get("transcript", "").strip()
-                    if text:
-                        self.transcript.append({"role": "bot", "text": text})
-                        print(f"  PATIENT: {text}")
-
-                # Transcript: agent (inbound) utterance transcribed
-                elif etype == "conversation.item.input_audio_transcription.completed":
-                    text = event.get("transcript", "").strip()
-                    if text:
-                        self.transcript.append({"role": "agent", "text": text})
-                        print(f"  AGENT:   {text}")
-
-                # Session confirmed updated
-                elif etype == "session.updated":
-                    print(f"  Session config applied")
-
-                # Errors
-                elif etype == "error":
-                    err = event.get("error", {})
-                    print(f"  Realtime error: {err.get('message', err)}")
-
-                # Response lifecycle (useful for debugging)
-                elif etype == "response.done":
-                    pass  # response complete, transcript already captured above
-
-                elif etype == "response.created":
-                    print(f"  OpenAI: Response generation started")
-
-                elif etype in (
-                    "response.output_item.added",
-                    "response.content_part.added",
-                    "response.audio.done",
-                    "response.content_part.done",
-                    "response.output_item.done",
-                    "input_audio_buffer.speech_started",
-                    "input_audio_buffer.committed",
-                ):
-                    # Known events we can safely ignore in logs
-                    pass
-
-                elif etype == "input_audio_buffer.speech_started":
-                    print(f"  OpenAI: Speech detected in input")
-
-                elif etype == "input_audio_buffer.speech_stopped":
-                    print(f"  OpenAI: Speech ended in input")
-
-                else:
-                    # Log any unhandled events for debugging
-                    print(f"  OpenAI event: {etype}")
+                        send_audio(audio)
+                    raw = await recv()
+                await self._handle_event(raw)
 
+        except websockets.exceptions.ConnectionClosedOK:
+            pass
         except websockets.exceptions.ConnectionClosed as e:
-            print(f"  Realtime WebSocket closed: {e}")
+            log.info("  Realtime WebSocket closed: %s", e)
         except Exception as e:
-            print(f"  Realtime listener error: {type(e).__name__}: {e}")
+            log.info("  Realtime listener error: %s: %s", type(e).__name__, e)
+
+    async def _handle_event(self, raw):
+        """Slow path: dispatch any event the audio loop didn't forward."""
+        # Ignored events are recognized from the frame head, never decoded
+        if _peek_type(raw) in _IGNORED_EVENTS:
+            return
+
+        event = orjson.loads(raw)
+        etype = event["type"]
+
+        handler = self._handlers.get(etype)
+        if handler:
+            await handler(event)
+
+        elif etype in _IGNORED_EVENTS:
+            pass
+
+        else:
+            # Log any unhandled events for debugging
+            log.info("  OpenAI event: %s", etype)
+
+    # Audio output: patient voice → play on the call
+    async def _on_audio_delta(self, event: dict):
+        audio = event.get("delta", "")
+        if audio:
+            self._send_telnyx_audio(audio)
+
+    # Transcript: patient (bot) finished a response
+    async def _on_patient_transcript(self, event: dict):
+        text = event.get("transcript", "").strip()
+        if text:
+            self._record("bot", text)
+            log.info("  PATIENT: %s", text)
+
+    # Transcript: agent (inbound) utterance transcribed
+    async def _on_agent_transcript(self, event: dict):
+        text = event.get("transcript", "").strip()
+        if text:
+            self._record("agent", text)
+            log.info("  AGENT:   %s", text)
+
+    def _record(self, role: str, text: str):
+        """Keep a transcript turn in memory and append it to the .jsonl log.
+
+        Turns carry a raw time.time_ns() stamp; it is only formatted by
+        whatever reads the log.
+        """
+        entry = {"role": role, "text": text, "ts_ns": time.time_ns()}
+        self.transcript.append(entry)
+        if self._transcript_file:
+            self._transcript_file.write(orjson.dumps(entry) + b"\n")
+
+    # Session confirmed updated
+    async def _on_session_updated(self, event: dict):
+        log.info("  Session config applied")
+
+    # Errors
+    async def _on_error(self, event: dict):
+        err = event.get("error", {})
+        log.info("  Realtime error: %s", err.get("message", err))
+
+    # Response lifecycle (useful for debugging)
+    async def _on_response_created(self, event: dict):
+        log.info("  OpenAI: Response generation started")
+
+    async def _on_speech_stopped(self, event: dict):
+        log.info("  OpenAI: Speech ended in input")
 
     # Send audio back to Telnyx
-    async def _send_telnyx_audio(self, audio_base64: str):
-        """Send audio payload back to Telnyx media stream."""
-        try:
-            self._audio_chunks_sent += 1
-            if self._audio_chunks_sent in (1, 10, 50, 100, 500):
-                print(f"  Audio chunks sent to Telnyx: {self._audio_chunks_sent}")
-            await self.telnyx_ws.send_text(json.dumps({
-                "event": "media",
-                "media": {"payload": audio_base64},
-            }))
-        except Exception as e:
-            print(f"  Failed to send audio to Telnyx: {e}")
+    def _send_telnyx_audio(self, audio_base64: str):
+        """Queue an audio payload for the Telnyx writer task."""
+        self._audio_chunks_sent += 1
+        if self._audio_chunks_sent == 1:
+            log.info("  Audio flowing to Telnyx")
+        elif log.isEnabledFor(logging.DEBUG):
+            now = time.monotonic()
+            if now - self._tx_logged_at >= self._AUDIO_LOG_INTERVAL:
+                self._tx_logged_at = now
+                log.debug("  Audio chunks sent to Telnyx: %d", self._audio_chunks_sent)
+
+        if self._tx_dropping:
+            if self._tx_pending > self._TX_LOW_WATER:
+                return
+            self._tx_dropping = False
+            log.info("  Telnyx send backlog drained, resuming audio")
+        elif self._tx_pending > self._TX_HIGH_WATER or self._tx_queue.full():
+            self._tx_dropping = True
+            log.info("  Telnyx send backlog full, dropping audio")
+            return
+
+        self._tx_pending += len(audio_base64)
+        self._tx_queue.put_nowait(audio_base64)
+
+    async def _telnyx_writer(self):
+        """Background task: drain queued audio and send it to Telnyx.
+
+        Deltas that pile up while a send is in flight are coalesced into a
+        single media frame of up to ~8KB. Base64 strings can't be
+        concatenated as-is, so batches are decoded, joined and re-encoded once.
+        """
+        tx_queue = self._tx_queue
+        while True:
+            chunks = [await tx_queue.get()]
+            size = len(chunks[0])
+            while len(chunks) < self._TX_BATCH_MAX_FRAMES and size < self._TX_BATCH_MAX_CHARS:
+                try:
+                    chunk = tx_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+
+            try:
+                payloads = chunks
+                if len(chunks) > 1:
+                    try:
+                        payloads = [base64.b64encode(
+                            b"".join(base64.b64decode(c) for c in chunks)
+                        ).decode("ascii")]
+                    except binascii.Error as e:
+                        # A malformed delta can't be merged; send the batch as-is
+                        log.info("  Could not coalesce audio batch: %s", e)
+
+                for payload in payloads:
+                    await self.telnyx_ws.send_text(
+                        self._MEDIA_PREFIX + payload + self._MEDIA_SUFFIX
+                    )
+            except Exception as e:
+                log.info("  Failed to send audio to Telnyx: %s", e)
+            finally:
+                self._tx_pending -= size
 
     # Helpers
+    def _spawn(self, coro):
+        """Run a background task owned by this bridge until close()."""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task):
+        # Report a crash as it happens rather than when the bridge closes
+        self._tasks.discard(task)
+        exc = None if task.cancelled() else task.exception()
+        if exc:
+            log.info("  Bridge task %s failed: %s: %s", task.get_coro().__name__, type(exc).__name__, exc)
+
     async def _send(self, msg: dict):
-        """Send a JSON message to OpenAI."""
+        """Send a JSON message to OpenAI (as a text frame)."""
         if self.openai_ws:
-            await self.openai_ws.send(json.dumps(msg))
+            await self.openai_ws.send(orjson.dumps(msg).decode())
 
     async def close(self):
         """Clean up the Realtime connection."""
         self._connected = False
-        if self._listener_task:
-            self._listener_task.cancel()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        # Wait for cancellation to land so no task outlives the bridge
+        await asyncio.gather(*tasks, return_exceptions=True)
         if self.openai_ws:
             try:
                 await self.openai_ws.close()
             except Exception:
                 pass
-        print(f"  Bridge closed ({len(self.transcript)} transcript entries)")
+        if self._transcript_file:
+            self._transcript_file.close()
+            self._transcript_file = None
+        log.info(
+            "  Bridge closed (%d transcript entries, %d audio chunks in, %d out)",
+            len(self.transcript), self._audio_chunks_received, self._audio_chunks_sent,
+        )
 
@@ -20,5 +20,16 @@ STREAM_URL = f"{WEBHOOK_BASE_URL.replace('https://', 'wss://').replace('http://'
 # GA model: "gpt-realtime" | Beta/preview: "gpt-4o-realtime-preview"
 REALTIME_MODEL = "gpt-4o-realtime-preview"
 
+# Treat binary Realtime frames as raw g711_ulaw audio and forward them
+# without the JSON/base64 delta envelope. Off unless the session actually
+# sends binary audio frames.
+USE_BINARY_AUDIO = os.getenv("USE_BINARY_AUDIO", "").lower() in ("1", "true", "yes")
+
+# Bridge log level; DEBUG adds periodic audio chunk counts
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
 # Call settings
 MAX_CALL_DURATION = 240  # seconds (4 min)
+
+# Saved call transcripts
+TRANSCRIPTS_DIR = os.path.join(os.path.dirname(__file__), "..", "transcripts")
@@ -6,6 +6,10 @@ The agent supports:
   - Refilling prescriptions
 
 Scenarios cover happy paths, edge cases, and stress tests.
+
+Set "capture_agent_transcripts": False on a scenario to skip Whisper
+transcription of the agent's side (saves Realtime work and events, but the
+saved transcript then only has the patient's turns).
 """
 
 SCENARIOS = [
@@ -188,3 +192,29 @@ SCENARIOS = [
         ),
     },
 ]
+
+
+# Wrapper around each scenario persona, sent as the Realtime session instructions
+PATIENT_WRAPPER = (
+    "You are role-playing as a patient calling an orthopedic clinic (Pivot Point "
+    "Orthopedics) on the phone. You are speaking with the clinic's AI receptionist.\n\n"
+    "RULES:\n"
+    "- Stay in character at all times as the patient described below\n"
+    "- Respond naturally and conversationally, like a real phone call\n"
+    "- Keep responses to 1-3 sentences — don't monologue\n"
+    "- Do not narrate actions or use stage directions\n"
+    "- If the receptionist asks for info your character has, provide it naturally\n"
+    "- When the conversation reaches a natural end, say goodbye politely\n\n"
+    "PATIENT PERSONA:\n{scenario_prompt}\n\n"
+    "Start the conversation with something like: \"{opening_line}\""
+)
+
+# Scenario id → fully formatted instructions. Scenarios never change at
+# runtime, so format once here instead of on every call setup.
+PATIENT_INSTRUCTIONS = {
+    s["id"]: PATIENT_WRAPPER.format(
+        scenario_prompt=s["system_prompt"],
+        opening_line=s["opening_line"],
+    )
+    for s in SCENARIOS
+}
@@ -8,21 +8,25 @@ Endpoints:
 """
 
 import asyncio
-import json
 import os
-from datetime import datetime
+import time
+from dataclasses import dataclass
+from pathlib import Path
 
+import orjson
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
 import telnyx_api
 from bridge import RealtimeBridge
 from config import (
     MAX_CALL_DURATION,
+    OPENAI_API_KEY,
     STREAM_URL,
     TARGET_NUMBER,
     TELNYX_CONNECTION_ID,
     TELNYX_FROM_NUMBER,
+    TRANSCRIPTS_DIR,
     WEBHOOK_URL,
 )
 from scenarios import SCENARIOS
@@ -52,17 +56,35 @@ async def startup_check():
         issues.append("OPENAI_API_KEY not set")
     print(f"  Target:       {TARGET_NUMBER}")
     print(f"  Scenarios:    {len(SCENARIOS)}")
+    loop = asyncio.get_running_loop()
+    print(f"  Event loop:   {type(loop).__module__}.{type(loop).__name__}")
     if issues:
         print(f"\n  CONFIG ISSUES:")
         for i in issues:
             print(f"    - {i}")
     print()
 
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release the pooled Telnyx API connections."""
+    await telnyx_api.close()
+
 # In-memory state
-# call_control_id → {scenario, bridge, ...}
-calls: dict[str, dict] = {}
+@dataclass(slots=True)
+class CallState:
+    """Per-call state, from trigger until hangup."""
+    scenario: dict
+    bridge: RealtimeBridge | None = None
+    timeout_task: asyncio.Task | None = None
+    started_at: int = 0  # time.time_ns()
+
+
+# call_control_id → CallState
+calls: dict[str, CallState] = {}
+# call_control_id[:16] → call_control_id, for stream IDs that don't match exactly
+calls_prefix: dict[str, str] = {}
 
-TRANSCRIPTS_DIR = os.path.join(os.path.dirname(__file__), "..", "transcripts")
 os.makedirs(TRANSCRIPTS_DIR, exist_ok=True)
 
 
@@ -88,20 +110,22 @@ async def trigger_call(scenario_index: int):
         return JSONResponse({"error": f"Telnyx API error: {str(e)}"}, 500)
 
     call_control_id = result["call_control_id"]
-    calls[call_control_id] = {
-        "scenario": scenario,
-        "bridge": None,
-        "timeout_task": None,
-        "started_at": datetime.utcnow().isoformat(),
-    }
+    calls[call_control_id] = CallState(scenario, started_at=time.time_ns())
+    calls_prefix[call_control_id[:16]] = call_control_id
 
     print(f"   Call control ID: {call_control_id[:20]}...")
     return {"status": "calling", "call_control_id": call_control_id, "scenario": scenario["name"]}
 
 
+# Scenarios are static, so the listing is serialized once at import
+_SCENARIOS_JSON = orjson.dumps(
+    [{"index": i, "id": s["id"], "name": s["name"]} for i, s in enumerate(SCENARIOS)]
+)
+
+
 @app.get("/scenarios")
 async def list_scenarios():
-    return [{"index": i, "id": s["id"], "name": s["name"]} for i, s in enumerate(SCENARIOS)]
+    return Response(_SCENARIOS_JSON, media_type="application/json")
 
 
 @app.get("/")
@@ -149,7 +173,7 @@ async def _on_answered(call_control_id: str, payload: dict):
     await telnyx_api.stream_start(call_control_id, STREAM_URL)
 
     # Set a max-duration timer so calls don't run forever
-    state["timeout_task"] = asyncio.create_task(
+    state.timeout_task = asyncio.create_task(
         _call_timeout(call_control_id, MAX_CALL_DURATION)
     )
 
@@ -159,13 +183,18 @@ async def _on_hangup(call_control_id: str, payload: dict):
     state = calls.pop(call_control_id, None)
     if not state:
         return
+    # Only drop the prefix mapping if it still points at this call; a newer
+    # call with the same prefix may have replaced it
+    prefix = call_control_id[:16]
+    if calls_prefix.get(prefix) == call_control_id:
+        del calls_prefix[prefix]
 
-    if state.get("timeout_task"):
-        state["timeout_task"].cancel()
+    if state.timeout_task:
+        state.timeout_task.cancel()
 
-    bridge: RealtimeBridge | None = state.get("bridge")
+    bridge = state.bridge
     if bridge:
-        _save_transcript(bridge)
+        await _save_transcript(bridge)
         await bridge.close()
 
     print(f"  Call ended and cleaned up")
@@ -192,8 +221,12 @@ async def media_stream(ws: WebSocket):
 
     try:
         while True:
-            raw = await ws.receive_text()
-            data = json.loads(raw)
+            # Raw ASGI receive: orjson parses text or binary frames as-is
+            msg = await ws.receive()
+            if msg["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(msg.get("code", 1000))
+            raw = msg.get("bytes") or msg.get("text")
+            data = orjson.loads(raw)
             event = data.get("event")
 
             if event == "connected":
@@ -208,16 +241,15 @@ async def media_stream(ws: WebSocket):
 
                 state = calls.get(call_control_id)
                 if not state:
-                    # Fallback: try to find by partial match (Telnyx sometimes sends a slightly different ID format)
-                    for cid, s in calls.items():
-                        if cid.startswith(call_control_id[:16]) or call_control_id.startswith(cid[:16]):
-                            state = s
-                            call_control_id = cid
-                            break
+                    # Fallback: match on the ID prefix (Telnyx sometimes sends a slightly different ID format)
+                    cid = calls_prefix.get(call_control_id[:16])
+                    if cid:
+                        state = calls.get(cid)
+                        call_control_id = cid
 
                 if state:
-                    bridge = RealtimeBridge(state["scenario"], ws, call_control_id)
-                    state["bridge"] = bridge
+                    bridge = RealtimeBridge(state.scenario, ws, call_control_id)
+                    state.bridge = bridge
                     await bridge.connect()
                 else:
                     print(f"[WS] No matching call state found!")
@@ -243,22 +275,24 @@ async def media_stream(ws: WebSocket):
 
 
 # Transcript saving
-def _save_transcript(bridge: RealtimeBridge):
+# transcript role → speaker label in the saved file
+ROLE_LABELS = {"bot": "PATIENT", "agent": "AGENT"}
+
+
+async def _save_transcript(bridge: RealtimeBridge):
+    """Write the call transcript to disk without blocking the event loop."""
     scenario = bridge.scenario
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    filename = f"{scenario['id']}_{timestamp}.txt"
-    filepath = os.path.join(TRANSCRIPTS_DIR, filename)
+    filepath = os.path.join(TRANSCRIPTS_DIR, f"{bridge.transcript_stem}.txt")
 
-    lines = [
+    content = "\n".join([
         f"Scenario: {scenario['name']}",
         f"Started:  {bridge.started_at}",
-        f"Turns:    {len(bridge.transcript)}"
-    ]
-    for entry in bridge.transcript:
-        role = "PATIENT" if entry["role"] == "bot" else "AGENT"
-        lines.append(f"\n[{role}]: {entry['text']}")
-
-    with open(filepath, "w") as f:
-        f.write("\n".join(lines))
+        f"Turns:    {len(bridge.transcript)}",
+        *(f"\n[{ROLE_LABELS[e['role']]}]: {e['text']}" for e in bridge.transcript),
+    ])
+
+    # Other calls keep streaming audio on this loop, so do the disk write
+    # on a worker thread.
+    await asyncio.to_thread(Path(filepath).write_text, content)
 
     print(f"  Transcript saved: {filepath}")
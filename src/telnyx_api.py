@@ -9,14 +9,30 @@ HEADERS = {
     "Content-Type": "application/json",
 }
 
+# Streaming settings shared by every stream_start request
+_STREAM_START_STATIC = {
+    "stream_track": "inbound_track",
+    "stream_bidirectional_mode": "rtp",
+    "stream_bidirectional_codec": "PCMU",
+}
+
+
+# Shared client so create_call / stream_start / hangup reuse one pooled
+# keep-alive connection instead of a fresh TLS handshake per request
+_client = httpx.AsyncClient(base_url=BASE, headers=HEADERS, timeout=30)
+
 
 async def _post(path: str, json: dict) -> dict:
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(f"{BASE}{path}", headers=HEADERS, json=json, timeout=30)
-        if resp.status_code >= 400:
-            print(f"  Telnyx API error {resp.status_code}: {resp.text}")
-        resp.raise_for_status()
-        return resp.json()
+    resp = await _client.post(path, json=json)
+    if resp.status_code >= 400:
+        print(f"  Telnyx API error {resp.status_code}: {resp.text}")
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def close():
+    """Close the shared HTTP client (call on server shutdown)."""
+    await _client.aclose()
 
 
 async def create_call(to: str, from_: str, connection_id: str, webhook_url: str) -> dict:
@@ -37,10 +53,8 @@ async def stream_start(call_control_id: str, stream_url: str) -> dict:
     send raw g711_ulaw audio from OpenAI Realtime back to the call.
     """
     return await _post(f"/calls/{call_control_id}/actions/streaming_start", {
+        **_STREAM_START_STATIC,
         "stream_url": stream_url,
-        "stream_track": "inbound_track",
-        "stream_bidirectional_mode": "rtp",
-        "stream_bidirectional_codec": "PCMU",
     })
 
 